@@ -0,0 +1,146 @@
+'''
+Long-lived Stockfish analysis for one game.
+
+Instead of a fresh bounded search per call (engine.play / engine.analyse), an
+AnalysisSession keeps an infinite engine.analysis() running on the current
+position. When a move is made the search is switched to the new position
+without ucinewgame, so the transposition table filled while analysing the
+previous ply is reused and depth is reached much sooner. Consumers can read
+the latest depth/score/PV snapshot at any time, or wait for a given depth.
+'''
+
+import threading
+import time
+
+import chess
+import chess.engine
+
+
+class AnalysisSession():
+    """
+    engine: a chess.engine.SimpleEngine (or compatible) that nothing else uses while the
+            session runs; any other command on it would cancel the running analysis.
+    multipv: number of principal variations kept in each snapshot.
+    """
+
+    def __init__(self, engine, multipv=3):
+        self.engine = engine
+        self.multipv = multipv
+        self.game = object()  # Same game object for every search -> python-chess never sends ucinewgame
+        self._cond = threading.Condition()
+        self._analysis = None
+        self._fen = None
+        self._snapshot = None
+        self._closed = False
+
+    def set_position(self, board):
+        """
+        Switch the running analysis to board (a python-chess Board, copied).
+        """
+        board = board.copy()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("analysis session is closed")
+            if self._fen == board.fen() and self._analysis is not None:
+                return
+            previous = self._analysis
+            self._analysis = None
+            self._fen = board.fen()
+            self._snapshot = {"fen": self._fen, "depth": 0, "score": None, "pvs": [], "started": time.perf_counter()}
+            self._cond.notify_all()
+        if previous is not None:
+            previous.stop()
+        if board.is_game_over():
+            return  # Nothing to search; snapshot stays at depth 0
+        analysis = self.engine.analysis(board, multipv=self.multipv, game=self.game)
+        with self._cond:
+            if self._fen != board.fen() or self._closed:
+                analysis.stop()
+                return
+            self._analysis = analysis
+        threading.Thread(target=self._follow, args=(analysis, board.fen()), name="analysis-session", daemon=True).start()
+
+    def _follow(self, analysis, fen):
+        try:
+            for info in analysis:
+                if "depth" not in info or "score" not in info:
+                    continue
+                pvs = analysis.multipv
+                with self._cond:
+                    if self._analysis is not analysis:
+                        break
+                    self._snapshot = {
+                        "fen": fen,
+                        "depth": info["depth"],
+                        "score": pvs[0].get("score", info["score"]) if pvs else info["score"],
+                        "pvs": [(pv.get("pv", []), pv.get("score")) for pv in pvs],
+                        "started": self._snapshot["started"],
+                    }
+                    self._cond.notify_all()
+        except (chess.engine.EngineError, chess.engine.EngineTerminatedError):
+            pass  # Engine went away; readers fall back to whatever snapshot they have
+
+    def _copy_snapshot(self):
+        snapshot = dict(self._snapshot)
+        snapshot["elapsed"] = time.perf_counter() - snapshot["started"]
+        return snapshot
+
+    def snapshot(self):
+        """
+        Latest {"fen", "depth", "score", "pvs", "elapsed"} for the current position, or None.
+        score is a PovScore; pvs is a list of (moves, PovScore), best first; elapsed is
+        seconds since the session switched to this position.
+        """
+        with self._cond:
+            return None if self._snapshot is None else self._copy_snapshot()
+
+    def wait_for_depth(self, board, depth, timeout=None):
+        """
+        Block until the analysis of board has reached depth, then return its snapshot.
+        On timeout the latest (shallower) snapshot is returned. Returns None if the
+        session has moved on to a different position.
+        """
+        fen = board.fen()
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                if self._snapshot is None or self._snapshot["fen"] != fen or self._closed:
+                    return None
+                if self._snapshot["depth"] >= depth or (self._analysis is None and board.is_game_over()):
+                    return self._copy_snapshot()
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return self._copy_snapshot()
+                self._cond.wait(remaining)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            analysis, self._analysis = self._analysis, None
+            self._cond.notify_all()
+        if analysis is not None:
+            analysis.stop()
+
+
+def snapshot_evaluation(snapshot):
+    """
+    Centipawn score from White's perspective, matching get_current_evaluation().
+    """
+    if snapshot is None or snapshot["score"] is None:
+        return None
+    return snapshot["score"].white().score(mate_score=10000)
+
+
+def snapshot_lines(snapshot, line_length=5):
+    """
+    Best lines in the same shape as get_best_lines(): [{'line': [UCI moves], 'evaluation': score}].
+    """
+    if snapshot is None:
+        return []
+    lines = []
+    for moves, score in snapshot["pvs"]:
+        if not moves:
+            continue
+        evaluation = score.white().score(mate_score=10000) if score is not None else None
+        lines.append({"line": [move.uci() for move in moves[:line_length]], "evaluation": evaluation})
+    return lines
@@ -0,0 +1,408 @@
+'''
+Responsible for user-input and showing the current game state.
+'''
+
+import pygame as p
+import chess_engine  # Your module for game state and move generation
+import chess
+import chess.engine
+import pyttsx3
+import requests
+import commentary_client
+import commentary_cache
+import pipeline_scheduler
+import position_store
+import analysis_session
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+WIDTH = HEIGHT = 512
+DIMENSION = 8
+SQ_SIZE = HEIGHT//DIMENSION
+MAX_FPS = 15
+Images = {}
+
+# ----- TTS Setup -----
+# pyttsx3 engines are not thread-safe (and the macOS driver runs a Cocoa run loop), so the engine is
+# created and driven on one dedicated thread; the speech stage hands text over and waits for it.
+tts_engine = None  # Created on the TTS thread; replay_benchmark swaps in a fake.
+tts_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+
+# ----- Stockfish Setup -----
+stockfish_path = "/stockfish-macos-x86-64"  # Update with your Stockfish binary path
+sf_engine = None  # Created by init_stockfish(); replay_benchmark swaps in a fake.
+
+# ----- Persistent Analysis Session -----
+# Keeps Stockfish searching the current position between moves and reuses its hash across plies.
+# When set, evaluation and best lines come from its MultiPV snapshot instead of fresh searches.
+ANALYSIS_DEPTH = 16
+ANALYSIS_TIMEOUT = 10  # seconds to wait for ANALYSIS_DEPTH before using the deepest result so far
+sf_session = None  # Created in main()
+
+# ----- Ollama Commentary Client -----
+# One client per session: warmed up at startup, model pinned with keep_alive, HTTP connection reused.
+llm_client = None  # Created in main(); replay_benchmark swaps in a fake.
+
+# ----- Commentary Cache -----
+# Bump PROMPT_TEMPLATE_VERSION whenever generate_deepseek_prompt changes, so stale commentary is not reused.
+PROMPT_TEMPLATE_VERSION = 1
+comment_cache = commentary_cache.CommentaryCache(max_entries=2048, max_age=None, variety=1,
+                                                 path="commentary_cache.json", save_interval=60)
+
+# ----- Pipeline Scheduler -----
+# Evaluation, commentary and speech run off the UI thread. Each stage only keeps the latest
+# pending move, and jobs for a move that is no longer the latest one are skipped.
+pipeline = pipeline_scheduler.default_scheduler()
+move_generation = 0  # Bumped on every move/undo; jobs carry the generation they were created for.
+
+# ----- Analysed Position Export -----
+# Every analysed position is appended to a columnar store for offline mining (see position_store).
+positions_path = "analysed_positions"
+position_writer = None  # Created in main(); replay_benchmark leaves it off unless asked.
+game_id = int(time.time() * 1000)  # Identifies this session's game in the export
+
+# ----- Console Output -----
+VERBOSE = True  # Print moves, prompts and commentary; replay_benchmark turns this off unless --verbose
+on_spoken = None  # Optional callback(generation) after a move's commentary has been spoken
+
+def log(*args):
+    if VERBOSE:
+        print(*args)
+
+# ----- Global Move History (for context in commentary) -----
+white_moves_history = []
+black_moves_history = []
+
+'''
+Initialize a dictionary of Images, called once.
+'''
+
+def loadImages():
+    pieces = ['wp','wR','wN','wB','wQ','wK','bp','bR','bN','bB','bQ','bK']
+    for piece in pieces:
+        Images[piece] = p.transform.scale(p.image.load("myenv/images/"+piece+".png"),(SQ_SIZE,SQ_SIZE))
+
+
+#All Graphics
+def drawGameState(screen,gs):
+    drawBoard(screen)
+    drawPieces(screen, gs.board)
+
+#Draw the squares on the board.
+def drawBoard(screen):
+    colors = [p.Color("white"),p.Color("grey")]
+
+    for r in range(DIMENSION):
+        for c in range(DIMENSION):
+            color = colors[((r+c)%2)]
+            p.draw.rect(screen,color,p.Rect(c*SQ_SIZE,r*SQ_SIZE,SQ_SIZE,SQ_SIZE))
+
+            
+
+#Draw the pieces on the board.
+def drawPieces(screen, board):
+
+    for row in range(DIMENSION):
+        for col in range(DIMENSION):
+            piece = board[row][col]
+
+            if(piece!="--"):
+                screen.blit(Images[piece],p.Rect(col*SQ_SIZE,row*SQ_SIZE,SQ_SIZE,SQ_SIZE))
+
+
+def create_tts_engine():
+    # Runs on tts_thread only
+    global tts_engine
+    if tts_engine is None:
+        tts_engine = pyttsx3.init()
+        tts_engine.setProperty('rate', 150)  # Adjust speech rate if desired
+
+def init_tts():
+    tts_thread.submit(create_tts_engine).result()
+
+def init_stockfish(path=None):
+    global sf_engine
+    sf_engine = chess.engine.SimpleEngine.popen_uci(path or stockfish_path)
+
+def sync_analysis_board(analysis_board, move):
+    """
+    Apply a chess_engine.Move to the python-chess analysis board.
+    getChessNotation() returns SAN-like strings, so the UCI move is built from the squares.
+    Returns False if the move could not be applied.
+    """
+    try:
+        uci_move = chess.Move.from_uci(move.getRankFile(move.startRow, move.startCol) +
+                                       move.getRankFile(move.endRow, move.endCol))
+    except ValueError:
+        return False
+    if uci_move in analysis_board.legal_moves:
+        analysis_board.push(uci_move)
+        return True
+    return False
+
+def get_best_lines(current_board, engine, num_lines=3, line_length=5):
+    """
+    For the given board (a python-chess Board object), generate 'num_lines'
+    best move sequences of length 'line_length' by simulating moves using Stockfish.
+    Returns a list of dictionaries: {'line': [list of moves in UCI], 'evaluation': score}
+    """
+    lines = []
+    for _ in range(num_lines):
+        temp_board = current_board.copy()
+        line_moves = []
+        for i in range(line_length):
+            if temp_board.is_game_over():  # No move to play after mate/stalemate
+                break
+            result = engine.play(temp_board, chess.engine.Limit(depth=16))
+            line_moves.append(result.move.uci())
+            temp_board.push(result.move)
+        # Get evaluation of final position (score from White's perspective)
+        info = engine.analyse(temp_board, chess.engine.Limit(depth=16))
+        score = info["score"].white().score(mate_score=10000)
+        lines.append({"line": line_moves, "evaluation": score})
+    return lines
+
+def get_current_evaluation(current_board, engine):
+    info = engine.analyse(current_board, chess.engine.Limit(depth=16))
+    score = info["score"].white().score(mate_score=10000)
+    return score
+
+def generate_deepseek_prompt(move_played, white_history, black_history, best_lines, current_eval):
+    """
+    Build a prompt string for DeepSeek using:
+      - move_played: the notation for the move just made.
+      - white_history, black_history: comma-separated strings of moves so far.
+      - best_lines: a list of dicts with 'line' and 'evaluation'
+      - current_eval: current evaluation score.
+    """
+    prompt = f""" **Game Context**: White's moves so far: {', '.join(white_history) if white_history else 'None'} Black's moves so far: {', '.join(black_history) if black_history else 'None'}
+
+    **Latest Move**:
+    Move played: {move_played}
+
+    **Current Board Evaluation**:
+    Evaluation (in centipawns from White's perspective): {current_eval}
+
+    **Stockfish Analysis**:
+    Here are the top suggested lines (each with 5 moves) from Stockfish:
+    """
+    for i, line in enumerate(best_lines, start=1):
+        moves_str = ' '.join(line['line'])
+        prompt += f"\nLine {i}: {moves_str}  (Evaluation: {line['evaluation']})"
+    
+    prompt += """
+
+    **Your Task**:
+    As a world-class chess commentator, provide exciting, suspenseful, and dramatic commentary on the move just played and the board situation. Highlight if the move is a blunder, an inaccuracy, or a brilliant tactical stroke. Build tension and use storytelling to make the audience sit on the edge of their seats. Include voice modulation hints (e.g., rising tone, dramatic pause) in your commentary.
+    """
+
+    return prompt
+
+def get_deepseek_commentary(prompt):
+    """
+    Use Ollama to chat with the DeepSeek model for commentary.
+    """
+    return llm_client.chat(prompt)
+
+def speak_on_tts_thread(text):
+    create_tts_engine()
+    tts_engine.say(text)
+    tts_engine.runAndWait()
+
+def speak_commentary(text):
+    tts_thread.submit(speak_on_tts_thread, text).result()
+
+def export_position(board, current_eval, best_lines, cache_key):
+    if position_writer is not None:
+        position_writer.append(board, current_eval, best_lines,
+                               commentary_id=commentary_cache.key_id(cache_key), game=game_id)
+
+def is_current(generation):
+    return generation == move_generation
+
+def analyse_move(generation, board, move_played, white_history, black_history):
+    """
+    Evaluation stage: evaluate the position and either reuse cached commentary
+    or compute the best lines and queue the prompt for the commentary stage.
+    """
+    if not is_current(generation):
+        return
+    # ----- Stockfish Analysis ----- #
+    snapshot = None
+    if sf_session is not None and not board.is_game_over():
+        snapshot = sf_session.wait_for_depth(board, ANALYSIS_DEPTH, timeout=ANALYSIS_TIMEOUT)
+        if snapshot is None:  # The session has already moved on to a newer position
+            return
+        log(f"Analysis depth {snapshot['depth']} reached in {snapshot['elapsed']:.2f}s")
+        current_eval = analysis_session.snapshot_evaluation(snapshot)
+    else:
+        current_eval = get_current_evaluation(board, sf_engine)
+
+    # ----- Commentary Cache Lookup ----- #
+    # Same position, move and evaluation bucket -> reuse commentary and skip the best lines and LLM.
+    cache_key = commentary_cache.make_key(board, move_played, current_eval, PROMPT_TEMPLATE_VERSION)
+    commentary = comment_cache.get(cache_key)
+    if commentary is not None:
+        # The session's lines come for free; only the bounded get_best_lines() search is skipped.
+        export_position(board, current_eval, analysis_session.snapshot_lines(snapshot, line_length=5), cache_key)
+        log("DeepSeek Commentary:\n", commentary)
+        pipeline.submit(pipeline_scheduler.SPEECH, speak_move, generation, commentary, coalesce_key="latest")
+        return
+
+    # Get three best move sequences (each 5 moves)
+    if snapshot is not None:
+        best_lines = analysis_session.snapshot_lines(snapshot, line_length=5)
+    else:
+        best_lines = get_best_lines(board, sf_engine, num_lines=3, line_length=5)
+    export_position(board, current_eval, best_lines, cache_key)
+
+    # ----- Build the DeepSeek Prompt ----- #
+    prompt = generate_deepseek_prompt(move_played, white_history, black_history, best_lines, current_eval)
+    log("DeepSeek Prompt:\n", prompt)
+    pipeline.submit(pipeline_scheduler.COMMENTARY, comment_move, generation, cache_key, prompt, coalesce_key="latest")
+
+def comment_move(generation, cache_key, prompt):
+    """
+    Commentary stage: get commentary from DeepSeek, cache it and queue it for speech.
+    """
+    if not is_current(generation):
+        return
+    commentary = get_deepseek_commentary(prompt)
+    comment_cache.put(cache_key, commentary)
+    log("DeepSeek Commentary:\n", commentary)
+    pipeline.submit(pipeline_scheduler.SPEECH, speak_move, generation, commentary, coalesce_key="latest")
+
+def speak_move(generation, commentary):
+    """
+    Speech stage: use TTS to speak the commentary, unless a newer move has been made since.
+    """
+    if not is_current(generation):
+        return
+    speak_commentary(commentary)
+    if on_spoken is not None:
+        on_spoken(generation)
+
+def handle_move(gs, analysis_board, move, validMoves=None):
+    """
+    Per-move path shared by main() and replay_benchmark: apply a chess_engine.Move to the
+    game state and the analysis board, record it in the move history and hand it to the
+    pipeline. Returns the move's generation, or None if the move is not valid or cannot be
+    mirrored on the analysis board (e.g. a promotion, which GameState plays as a plain pawn
+    push); neither board is changed in that case, so the two never drift apart.
+    """
+    global move_generation
+    if validMoves is None:
+        validMoves = gs.getValidMoves()
+    if move not in validMoves:
+        return None
+    moveNotation = move.getChessNotation()
+
+    # Update the analysis_board (python-chess board) first, so a move it rejects is not played at all
+    if not sync_analysis_board(analysis_board, move):
+        log("Could not apply move to analysis board:", moveNotation)
+        return None
+    log("Move made:", moveNotation)
+
+    # Update move history: determine whose move it was before making it
+    if gs.whiteToMove:
+        white_moves_history.append(moveNotation)
+    else:
+        black_moves_history.append(moveNotation)
+
+    gs.makeMove(move)  # Update game state via your engine
+
+    # ----- Hand the move over to the pipeline ----- #
+    if sf_session is not None:
+        sf_session.set_position(analysis_board)  # Start searching right away, keeping the hash
+    move_generation += 1
+    pipeline.submit(pipeline_scheduler.EVALUATION, analyse_move, move_generation,
+                    analysis_board.copy(), moveNotation,
+                    list(white_moves_history), list(black_moves_history),
+                    coalesce_key="latest")
+    return move_generation
+
+#Main code, to handle input and update the graphics.
+
+def main():
+    global move_generation, position_writer, sf_session, llm_client
+    # Start loading the model first; it is the slowest thing to get ready.
+    llm_client = commentary_client.CommentaryClient(model="deepseek-r1:1.5b")
+    llm_client.warm_up(background=True)
+    p.init()
+    screen = p.display.set_mode((WIDTH, HEIGHT))
+    clock = p.time.Clock()
+    screen.fill(p.Color("white"))
+    gs = chess_engine.GameState()  # Your game state (manages board, moves, etc.)
+    
+    # Also create a python-chess Board for analysis with Stockfish:
+    analysis_board = chess.Board()  # We'll update this as moves are made
+    
+    loadImages()
+    init_tts()
+    init_stockfish()
+    # A game is only ~80 positions: write them out every minute rather than once at exit
+    position_writer = position_store.PositionWriter(positions_path, flush_interval=60)
+    sf_session = analysis_session.AnalysisSession(sf_engine, multipv=3)
+    sf_session.set_position(analysis_board)
+    pipeline.start()
+    running = True
+    sqSelected = ()  # Track user clicks
+    playerClicks = []  # Record clicks
+    validMoves = gs.getValidMoves()
+    moveMadeFlag = False
+    
+    while running:
+        for e in p.event.get():
+            if e.type == p.QUIT:
+                running = False
+            elif e.type == p.MOUSEBUTTONDOWN:
+                location = p.mouse.get_pos()
+                col = location[0] // SQ_SIZE
+                row = location[1] // SQ_SIZE
+
+                if sqSelected == (row, col):
+                    sqSelected = ()  # Unselect
+                    playerClicks = []
+                else:
+                    sqSelected = (row, col)
+                    playerClicks.append(sqSelected)
+                
+                # When two clicks are made, attempt to form a move
+                if len(playerClicks) == 2:
+                    move = chess_engine.Move(playerClicks[0], playerClicks[1], gs.board)
+                    if handle_move(gs, analysis_board, move, validMoves) is not None:
+                        moveMadeFlag = True
+                        sqSelected = ()
+                        playerClicks = []
+                    else:
+                        playerClicks = [sqSelected]
+            elif e.type == p.KEYDOWN:
+                if e.key == p.K_z:
+                    gs.undoMove()
+                    if analysis_board.move_stack:  # Undo move in analysis_board as well
+                        analysis_board.pop()
+                    move_generation += 1  # Anything queued for the undone move is now stale
+                    pipeline.cancel()
+                    sf_session.set_position(analysis_board)
+                    moveMadeFlag = True
+
+        if moveMadeFlag:
+            validMoves = gs.getValidMoves()
+            moveMadeFlag = False
+
+        drawGameState(screen, gs)
+        clock.tick(MAX_FPS)
+        p.display.flip()
+
+    move_generation += 1  # Whatever is still in flight is stale now; don't speak it on the way out
+    pipeline.shutdown(wait=True, cancel_pending=True, timeout=5)
+    print("Pipeline metrics:", pipeline.metrics())
+    sf_session.close()
+    position_writer.close()
+    comment_cache.save()
+    llm_client.close()
+    tts_thread.shutdown(wait=False, cancel_futures=True)
+    sf_engine.quit()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
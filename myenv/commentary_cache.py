@@ -0,0 +1,186 @@
+'''
+Cache for LLM commentary, so the same move in the same position with the same
+evaluation does not have to go through DeepSeek again.
+
+Entries are keyed on (position hash, move played, evaluation bucket, prompt
+template version), evicted least-recently-used once the cache is full, and can
+optionally be persisted to a JSON file between sessions.
+'''
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import chess.polyglot
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_EVAL_BUCKET = 50  # centipawns per evaluation bucket
+
+
+def eval_bucket(score, bucket_size=DEFAULT_EVAL_BUCKET):
+    """
+    Map a centipawn score (White's perspective) to a coarse bucket so that
+    small evaluation jitter between runs still hits the same entry.
+    """
+    if score is None:
+        return None
+    return int(score) // bucket_size
+
+
+def make_key(board, move_played, score, template_version, bucket_size=DEFAULT_EVAL_BUCKET):
+    """
+    Build the cache key for a position (python-chess Board, after the move),
+    the notation of the move just played, its evaluation and the prompt template version.
+    """
+    position_hash = chess.polyglot.zobrist_hash(board)
+    return (format(position_hash, "016x"), move_played, eval_bucket(score, bucket_size), str(template_version))
+
+
+def key_id(key):
+    """
+    Stable 63-bit integer id for a cache key, used to refer to a commentary from
+    other stores (e.g. the analysed positions export).
+    """
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+class CommentaryCache():
+    """
+    Size-bounded LRU cache of commentary strings.
+
+    max_entries: number of keys kept before the least recently used one is dropped.
+    max_age: seconds a commentary stays fresh; older entries are treated as a miss (None = never expire).
+    variety: number of distinct commentaries collected for a key before it is served
+             from the cache; hits then rotate through them so repeated openings do not
+             always sound the same.
+    path: optional JSON file the cache is loaded from and saved to.
+    save_interval: with a path, put() also saves the cache if the last save is at least
+                   this many seconds old, so a crash loses little (None = only explicit save()).
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_age=None, variety=1, path=None, save_interval=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if variety < 1:
+            raise ValueError("variety must be at least 1")
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.variety = variety
+        self.path = path
+        self.save_interval = save_interval
+        self._last_save = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> {"texts": [(timestamp, text), ...], "next": index}
+        self._lock = threading.Lock()  # pipeline stages read and write from different threads
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _fresh_texts(self, entry, now):
+        if self.max_age is None:
+            return entry["texts"]
+        return [(ts, text) for ts, text in entry["texts"] if now - ts <= self.max_age]
+
+    def get(self, key):
+        """
+        Return a cached commentary for key, or None if there is no fresh entry
+        or the key has not yet collected enough variants.
+        """
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        text = None
+        if entry is not None:
+            texts = self._fresh_texts(entry, time.time())
+            if len(texts) != len(entry["texts"]):
+                entry["texts"] = texts
+            if not texts:
+                del self._entries[key]
+            else:
+                self._entries.move_to_end(key)
+                if len(texts) >= self.variety:
+                    index = entry["next"] % len(texts)
+                    entry["next"] = index + 1
+                    text = texts[index][1]
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text
+
+    def put(self, key, text):
+        """
+        Store a commentary for key, keeping at most 'variety' variants per key.
+        """
+        with self._lock:
+            self._put(key, text)
+        if self.path is not None and self.save_interval is not None and \
+                time.monotonic() - self._last_save >= self.save_interval:
+            try:
+                self.save()
+            except OSError as ex:
+                print("Could not save commentary cache:", ex)
+
+    def _put(self, key, text):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {"texts": [], "next": 0}
+            self._entries[key] = entry
+        entry["texts"].append((time.time(), text))
+        if len(entry["texts"]) > self.variety:
+            del entry["texts"][0]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path=None):
+        """
+        Load entries from a JSON file written by save(), oldest first so the LRU order is kept.
+        An unreadable or corrupt file is reported and skipped, leaving the cache as it was.
+        """
+        path = path or self.path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            loaded = [(tuple(item["key"]), [tuple(t) for t in item["texts"]]) for item in data["entries"]]
+        except (OSError, ValueError, KeyError, TypeError) as ex:
+            print(f"Ignoring unreadable commentary cache {path}:", ex)
+            return
+        with self._lock:
+            for key, texts in loaded:
+                self._entries[key] = {"texts": texts, "next": 0}
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self, path=None):
+        """
+        Write the cache to a JSON file. The file is replaced atomically so a crash
+        mid-write never leaves a truncated cache behind.
+        """
+        path = path or self.path
+        if path is None:
+            return
+        with self._lock:
+            data = {"entries": [{"key": list(key), "texts": [list(t) for t in entry["texts"]]}
+                                for key, entry in self._entries.items()]}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        self._last_save = time.monotonic()
@@ -0,0 +1,115 @@
+'''
+Ollama client for DeepSeek commentary.
+
+One CommentaryClient is created per session. It reuses a single HTTP
+connection (ollama.Client keeps an httpx connection pool), loads the model in
+the background at startup so the first move does not pay model load time,
+keeps the model loaded between moves with keep_alive, unloads it again on
+close(), and applies a request timeout with a bounded number of retries. Pointing host at a local stand-in
+server (see replay_benchmark --ollama-standin) exercises the same HTTP path
+without a real model.
+'''
+
+import threading
+import time
+
+import httpx
+import ollama
+
+DEFAULT_MODEL = "deepseek-r1:1.5b"
+DEFAULT_KEEP_ALIVE = "30m"  # Long enough to span a game's pauses; an abandoned session still frees the memory
+
+
+class CommentaryClient():
+    """
+    model: Ollama model name.
+    host: Ollama server URL (None = OLLAMA_HOST or http://localhost:11434).
+    keep_alive: how long Ollama keeps the model loaded after each request ("30m", seconds, -1 = forever).
+    timeout: seconds per HTTP request.
+    retries: extra attempts after a timeout, connection error or 5xx response.
+    retry_backoff: seconds before the first retry, doubled for each further one.
+    client: an existing ollama.Client (or compatible object) to use instead of creating one.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, host=None, keep_alive=DEFAULT_KEEP_ALIVE,
+                 timeout=120, retries=2, retry_backoff=0.5, client=None):
+        if retries < 0:
+            raise ValueError("retries must not be negative")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.client = client if client is not None else ollama.Client(host=host, timeout=timeout)
+        self.ready = threading.Event()  # Set once warm-up has finished (successfully or not)
+        self.warm_up_error = None
+        self.warm_up_seconds = None
+
+    def warm_up(self, background=True):
+        """
+        Load the model into memory (an empty generate request) and keep it loaded for keep_alive.
+        With background=True this returns immediately and runs on a daemon thread.
+        """
+        if background:
+            threading.Thread(target=self.warm_up, args=(False,), name="ollama-warm-up", daemon=True).start()
+            return
+        started = time.perf_counter()
+        try:
+            self._with_retries(self.client.generate, model=self.model, prompt="", keep_alive=self.keep_alive)
+        except Exception as ex:
+            self.warm_up_error = ex
+            print("Ollama warm-up failed:", ex)
+        else:
+            self.warm_up_seconds = time.perf_counter() - started
+        finally:
+            self.ready.set()
+
+    def wait_ready(self, timeout=None):
+        return self.ready.wait(timeout)
+
+    def chat(self, prompt):
+        """
+        Send a single-turn chat and return the reply text.
+        """
+        response = self._with_retries(
+            self.client.chat,
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            keep_alive=self.keep_alive,
+        )
+        return response["message"]["content"]
+
+    def _with_retries(self, request, **kwargs):
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                return request(**kwargs)
+            except Exception as ex:
+                if attempt == self.retries or not is_retryable(ex):
+                    raise
+                print(f"Ollama request failed ({ex}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+    def close(self, unload=True):
+        """
+        Release the HTTP connection. With unload, first ask Ollama to unload the model
+        (keep_alive=0) so it does not hold memory after the game; failures are ignored.
+        """
+        if unload:
+            try:
+                self.client.generate(model=self.model, prompt="", keep_alive=0)
+            except Exception as ex:
+                print("Could not unload Ollama model:", ex)
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+
+def is_retryable(ex):
+    """
+    Timeouts, dropped connections and server errors are worth retrying; anything
+    else (e.g. model not found) will fail the same way again.
+    """
+    if isinstance(ex, ollama.ResponseError):
+        return ex.status_code >= 500
+    return isinstance(ex, (httpx.TimeoutException, httpx.TransportError, ConnectionError))
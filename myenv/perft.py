@@ -0,0 +1,233 @@
+'''
+Perft (move path enumeration) for chess_engine.GameState, on one core or split
+across processes.
+
+The parallel mode splits the root move list ("divide") over a multiprocessing
+pool. Positions are shipped to the workers as a compact 66-byte encoding
+(see encode_state) instead of pickled GameState objects, and the per-move
+counts are merged back in root move generation order, so the result is the
+same for any number of processes.
+
+Counts follow GameState's move generation, which has no en passant and no
+promotions (a pawn reaching the last rank is a single plain move instead of
+four promotion choices). Those are the only known differences from the
+standard perft numbers: --verify agrees with python-chess on positions where
+neither is reachable within the search depth (e.g. the initial position at
+depth 4, or r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - at depth 3, which exercises
+castling rights). Where they are reachable, mismatches are expected; on
+kiwipete, a2a4 at depth 2 gives 43 here against python-chess's 44, the missing
+node being the b4xa3 en passant reply. Any other mismatch is a GameState bug.
+
+Usage:
+    python myenv/perft.py --depth 4                     # all cores
+    python myenv/perft.py --depth 3 --processes 1 --divide
+    python myenv/perft.py --fen "<fen>" --depth 3 --verify
+'''
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import chess_engine
+
+PIECES = ['--','wp','wR','wN','wB','wQ','wK','bp','bR','bN','bB','bQ','bK']
+PIECE_CODES = {piece: code for code, piece in enumerate(PIECES)}
+FEN_PIECES = {'P':'wp','R':'wR','N':'wN','B':'wB','Q':'wQ','K':'wK',
+              'p':'bp','r':'bR','n':'bN','b':'bB','q':'bQ','k':'bK'}
+
+
+def encode_state(gs):
+    """
+    Encode a GameState as 66 bytes: 64 piece codes (row-major from a8), side to move,
+    and castling rights as a bitmask (wks=1, wqs=2, bks=4, bqs=8).
+    """
+    rights = gs.currentCastlingRights
+    castling = (rights.wks and 1) | (rights.wqs and 2) | (rights.bks and 4) | (rights.bqs and 8)
+    squares = bytes(PIECE_CODES[gs.board[r][c]] for r in range(8) for c in range(8))
+    return squares + bytes((1 if gs.whiteToMove else 0, castling))
+
+
+def decode_state(data):
+    """
+    Rebuild a GameState (with an empty move log) from encode_state() output.
+    """
+    gs = chess_engine.GameState()
+    gs.board = [[PIECES[data[r*8 + c]] for c in range(8)] for r in range(8)]
+    gs.whiteToMove = data[64] == 1
+    castling = data[65]
+    _set_castling_rights(gs, bool(castling & 1), bool(castling & 2), bool(castling & 4), bool(castling & 8))
+    _locate_kings(gs)
+    return gs
+
+
+def state_from_fen(fen):
+    """
+    GameState from a FEN string. Only piece placement, side to move and castling
+    rights are used; GameState has no en passant or move clocks.
+    """
+    fields = fen.split()
+    gs = chess_engine.GameState()
+    gs.board = []
+    for rank in fields[0].split('/'):
+        row = []
+        for ch in rank:
+            if ch.isdigit():
+                row.extend(['--'] * int(ch))
+            else:
+                row.append(FEN_PIECES[ch])
+        gs.board.append(row)
+    gs.whiteToMove = len(fields) < 2 or fields[1] == 'w'
+    castling = fields[2] if len(fields) > 2 else '-'
+    _set_castling_rights(gs, 'K' in castling, 'Q' in castling, 'k' in castling, 'q' in castling)
+    _locate_kings(gs)
+    return gs
+
+
+def _set_castling_rights(gs, wks, wqs, bks, bqs):
+    gs.currentCastlingRights = chess_engine.CastlingRights(bks, bqs, wqs, wks)
+    gs.castleRightsLog = [chess_engine.CastlingRights(bks, bqs, wqs, wks)]
+
+
+def _locate_kings(gs):
+    for r in range(8):
+        for c in range(8):
+            if gs.board[r][c] == 'wK':
+                gs.whiteKingLocation = (r, c)
+            elif gs.board[r][c] == 'bK':
+                gs.blackKingLocation = (r, c)
+
+
+def move_name(move):
+    return move.getRankFile(move.startRow, move.startCol) + move.getRankFile(move.endRow, move.endCol)
+
+
+def perft(gs, depth):
+    """
+    Number of leaf nodes of the legal move tree of the given depth.
+    """
+    if depth == 0:
+        return 1
+    moves = gs.getValidMoves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gs.makeMove(move)
+        nodes += perft(gs, depth - 1)
+        gs.undoMove()
+    return nodes
+
+
+def divide(gs, depth):
+    """
+    Perft split by root move: list of (move name, nodes) in move generation order.
+    """
+    results = []
+    for move in gs.getValidMoves():
+        gs.makeMove(move)
+        results.append((move_name(move), perft(gs, depth - 1)))
+        gs.undoMove()
+    return results
+
+
+def _divide_worker(task):
+    encoded, square, depth = task
+    gs = decode_state(encoded)
+    for move in gs.getValidMoves():
+        if (move.startRow, move.startCol, move.endRow, move.endCol) == square:
+            gs.makeMove(move)
+            return perft(gs, depth - 1)
+    raise ValueError(f"Root move {square} is not legal in the shipped position")
+
+
+def parallel_divide(gs, depth, processes=None):
+    """
+    divide(), with each root move's subtree counted in a separate worker process.
+    Results come back in root move generation order regardless of scheduling.
+    """
+    if depth < 1:
+        raise ValueError("depth must be at least 1")
+    moves = gs.getValidMoves()
+    encoded = encode_state(gs)
+    tasks = [(encoded, (m.startRow, m.startCol, m.endRow, m.endCol), depth) for m in moves]
+    if not tasks:
+        return []
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes == 1:
+        counts = [_divide_worker(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            # chunksize=1: subtrees differ a lot in size, so hand them out one at a time.
+            counts = pool.map(_divide_worker, tasks, chunksize=1)
+    return [(move_name(m), count) for m, count in zip(moves, counts)]
+
+
+def parallel_perft(gs, depth, processes=None):
+    if depth == 0:
+        return 1
+    return sum(count for _, count in parallel_divide(gs, depth, processes))
+
+
+def reference_divide(fen, depth):
+    """
+    The same divide computed with python-chess, for validating GameState's move generation.
+    """
+    import chess
+
+    def count(board, d):
+        if d == 0:
+            return 1
+        if d == 1:
+            return board.legal_moves.count()
+        nodes = 0
+        for move in board.legal_moves:
+            board.push(move)
+            nodes += count(board, d - 1)
+            board.pop()
+        return nodes
+
+    board = chess.Board(fen)
+    results = {}
+    for move in board.legal_moves:
+        board.push(move)
+        results[move.uci()] = count(board, depth - 1)
+        board.pop()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft for chess_engine.GameState, optionally across processes.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fen", help="start position (default: initial position)")
+    parser.add_argument("--processes", type=int, help="worker processes (default: all cores, 1 = no pool)")
+    parser.add_argument("--divide", action="store_true", help="print the node count of every root move")
+    parser.add_argument("--verify", action="store_true", help="compare every root move against python-chess (only positions that reach en passant or promotions are expected to mismatch)")
+    args = parser.parse_args(argv)
+
+    gs = state_from_fen(args.fen) if args.fen else chess_engine.GameState()
+    start = time.perf_counter()
+    results = parallel_divide(gs, args.depth, args.processes) if args.depth > 0 else []
+    elapsed = time.perf_counter() - start
+    nodes = sum(count for _, count in results) if args.depth > 0 else 1
+
+    if args.divide:
+        for name, count in results:
+            print(f"{name}: {count}")
+    print(f"Depth {args.depth}: {nodes} nodes in {elapsed:.2f}s ({nodes / elapsed if elapsed > 0 else 0:.0f} nodes/s)")
+
+    if args.verify:
+        import chess
+        expected = reference_divide(args.fen or chess.STARTING_FEN, args.depth)
+        actual = dict(results)
+        mismatches = sorted(name for name in set(expected) | set(actual) if expected.get(name) != actual.get(name))
+        for name in mismatches:
+            print(f"Mismatch {name}: GameState {actual.get(name)}, python-chess {expected.get(name)}")
+        print(f"python-chess: {sum(expected.values())} nodes, {len(mismatches)} root moves differ")
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
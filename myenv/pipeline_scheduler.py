@@ -0,0 +1,257 @@
+'''
+Stage scheduler for the per-move pipeline (Stockfish -> DeepSeek -> TTS).
+
+Moves can arrive faster than the pipeline can handle them (blitz, fast PGN
+replay). Instead of queueing every move's commentary, each stage keeps its
+pending work keyed by a coalesce key: submitting a job with a key that is
+already pending replaces the older job, so only the latest position is
+worked on. Stages have a priority (lower runs first: evaluation before
+commentary before speech) and a concurrency limit, and the scheduler
+exposes queue depth metrics for each of them. The worker pool can be smaller
+than the stages' combined concurrency; then priority decides which stage gets
+a worker that frees up while several have work waiting.
+'''
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+EVALUATION = "evaluation"
+COMMENTARY = "commentary"
+SPEECH = "speech"
+
+
+class Stage():
+    def __init__(self, name, priority, concurrency=1, max_pending=None):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.name = name
+        self.priority = priority
+        self.concurrency = concurrency
+        self.max_pending = max_pending  # None = unbounded; otherwise the oldest pending job is dropped
+        self.pending = OrderedDict()  # coalesce key -> Job
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+
+class Job():
+    def __init__(self, stage, fn, args, kwargs, on_done, on_error):
+        self.stage = stage
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.enqueued_at = time.perf_counter()
+
+
+class PipelineScheduler():
+    """
+    Runs submitted jobs on a small pool of worker threads, always picking the
+    highest-priority stage that has pending work and a free concurrency slot.
+
+    workers: size of the pool (None = the stages' combined concurrency, so no stage ever
+             waits for a worker and priority only orders jobs queued at the same moment).
+    """
+
+    def __init__(self, workers=None):
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.stages = {}
+        self._cond = threading.Condition()
+        self._workers = []
+        self._running = False
+        self._accepting = False  # False before start() and once shutdown() has begun
+        self._ids = itertools.count()
+
+    def add_stage(self, name, priority, concurrency=1, max_pending=None):
+        with self._cond:
+            if self._running:
+                raise RuntimeError("stages must be added before the scheduler is started")
+            self.stages[name] = Stage(name, priority, concurrency, max_pending)
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._accepting = True
+            workers = sum(stage.concurrency for stage in self.stages.values())
+            if self.workers is not None:
+                workers = min(workers, self.workers)
+            for i in range(workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"pipeline-worker-{i}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def shutdown(self, wait=True, cancel_pending=False, timeout=None):
+        """
+        Stop the workers. New submits are rejected from now on, including work chained
+        by jobs that are still running. Pending jobs are run first unless cancel_pending.
+        With wait, blocks until the workers exit or 'timeout' seconds have passed.
+        """
+        with self._cond:
+            self._accepting = False
+            if cancel_pending:
+                for stage in self.stages.values():
+                    stage.dropped += len(stage.pending)
+                    stage.pending.clear()
+            self._running = False
+            self._cond.notify_all()
+        if wait:
+            deadline = None if timeout is None else time.perf_counter() + timeout
+            for worker in self._workers:
+                worker.join(None if deadline is None else max(0, deadline - time.perf_counter()))
+        self._workers = []
+
+    def submit(self, stage_name, fn, *args, coalesce_key=None, on_done=None, on_error=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs) on a stage. Jobs sharing a coalesce_key on the
+        same stage replace each other while pending; None means never coalesce.
+        on_done(result) / on_error(exception) are called on the worker thread.
+        Returns False (and counts the job as dropped) if the scheduler is not accepting work.
+        """
+        with self._cond:
+            stage = self.stages[stage_name]
+            if not self._accepting:
+                stage.dropped += 1
+                return False
+            key = coalesce_key if coalesce_key is not None else ("job", next(self._ids))
+            stage.submitted += 1
+            if key in stage.pending:
+                del stage.pending[key]
+                stage.coalesced += 1
+            stage.pending[key] = Job(stage, fn, args, kwargs, on_done, on_error)
+            if stage.max_pending is not None:
+                while len(stage.pending) > stage.max_pending:
+                    stage.pending.popitem(last=False)
+                    stage.dropped += 1
+            self._cond.notify()
+            return True
+
+    def cancel(self, stage_name=None):
+        """
+        Drop pending (not yet running) jobs on one stage, or on every stage.
+        """
+        with self._cond:
+            stages = [self.stages[stage_name]] if stage_name is not None else self.stages.values()
+            for stage in stages:
+                stage.dropped += len(stage.pending)
+                stage.pending.clear()
+
+    def _next_job(self):
+        ready = [stage for stage in self.stages.values()
+                 if stage.pending and stage.running < stage.concurrency]
+        if not ready:
+            return None
+        stage = min(ready, key=lambda s: s.priority)
+        _, job = stage.pending.popitem(last=False)
+        stage.running += 1
+        return job
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if not self._running:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+            stage = job.stage
+            started = time.perf_counter()
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except Exception as ex:
+                result = None
+                error = ex
+            else:
+                error = None
+            finished = time.perf_counter()
+            # Callbacks run before the job is marked finished, so work they chain onto
+            # later stages is already pending when wait_idle() checks. The bookkeeping is
+            # in a finally so a raising callback cannot leave the stage slot taken.
+            try:
+                if error is not None:
+                    if job.on_error is not None:
+                        job.on_error(error)
+                    else:
+                        print(f"Pipeline {stage.name} job failed:", error)
+                elif job.on_done is not None:
+                    job.on_done(result)
+            except Exception as ex:
+                print(f"Pipeline {stage.name} callback failed:", ex)
+            finally:
+                with self._cond:
+                    stage.running -= 1
+                    stage.total_wait += started - job.enqueued_at
+                    stage.total_run += finished - started
+                    if error is None:
+                        stage.completed += 1
+                    else:
+                        stage.failed += 1
+                    self._cond.notify_all()
+
+    def queue_depths(self):
+        with self._cond:
+            return {name: len(stage.pending) for name, stage in self.stages.items()}
+
+    def idle(self):
+        with self._cond:
+            return all(not stage.pending and stage.running == 0 for stage in self.stages.values())
+
+    def wait_idle(self, timeout=None):
+        """
+        Block until every stage has no pending or running work. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while not all(not s.pending and s.running == 0 for s in self.stages.values()):
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def metrics(self):
+        """
+        Snapshot of per-stage counters: queue depth, running jobs, coalesced/dropped
+        jobs and mean wait/run times in seconds.
+        """
+        with self._cond:
+            snapshot = {}
+            for name, stage in self.stages.items():
+                finished = stage.completed + stage.failed
+                snapshot[name] = {
+                    "queue_depth": len(stage.pending),
+                    "running": stage.running,
+                    "submitted": stage.submitted,
+                    "completed": stage.completed,
+                    "failed": stage.failed,
+                    "coalesced": stage.coalesced,
+                    "dropped": stage.dropped,
+                    "mean_wait": stage.total_wait / finished if finished else 0.0,
+                    "mean_run": stage.total_run / finished if finished else 0.0,
+                }
+            return snapshot
+
+
+def default_scheduler(workers=2):
+    """
+    Scheduler with the three commentary stages: evaluation first, then commentary, then speech.
+    With two workers, a move's evaluation and the previous move's commentary or speech can
+    overlap, but a freed worker goes to a pending evaluation before commentary or speech.
+    """
+    scheduler = PipelineScheduler(workers)
+    scheduler.add_stage(EVALUATION, priority=0, concurrency=1)
+    scheduler.add_stage(COMMENTARY, priority=1, concurrency=1)
+    scheduler.add_stage(SPEECH, priority=2, concurrency=1)
+    return scheduler
@@ -0,0 +1,276 @@
+'''
+Columnar on-disk store of analysed positions.
+
+Every position that goes through Stockfish is appended to a PositionWriter,
+which buffers rows and writes them out in batches as shards. A shard is a
+directory with one NumPy .npy file per column, so PositionReader can
+memory-map just the columns a scan needs and filter months of games without
+loading everything into RAM or re-running the engine.
+
+Columns:
+    game            int64   game/session id
+    ply             int16   half-move number of the position
+    turn            uint8   side to move (1 = White, 0 = Black)
+    board           uint8   [32] piece placement, two squares per byte (see pack_board)
+    fen             S92     full FEN (castling rights, en passant, clocks)
+    eval            int32   centipawns from White's perspective, NO_EVAL if unknown (e.g. the
+                            analysis timed out at depth 0); filter with has_eval() before
+                            comparing scores, since NO_EVAL is the most negative int32
+    pv              int16   [MAX_LINES, MAX_LINE_LENGTH] encoded moves, -1 padded (see encode_move)
+    pv_eval         int32   [MAX_LINES] evaluation at the end of each line, NO_EVAL padded
+    commentary_id   int64   commentary_cache.key_id() of the commentary, -1 if none. The id is
+                            taken from the cache key when the position is evaluated, so it may
+                            refer to commentary that was never generated (the commentary job was
+                            coalesced away by a newer move, or DeepSeek failed).
+
+Shards are named shard-<index>-<pid>-<random>: the index keeps them in write
+order, and the suffix keeps two writers on the same directory from colliding.
+'''
+
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+import chess
+
+MAX_LINES = 3
+MAX_LINE_LENGTH = 5
+FEN_WIDTH = 92
+NO_EVAL = np.iinfo(np.int32).min
+
+COLUMNS = {
+    "game": (np.int64, ()),
+    "ply": (np.int16, ()),
+    "turn": (np.uint8, ()),
+    "board": (np.uint8, (32,)),
+    "fen": ("S%d" % FEN_WIDTH, ()),
+    "eval": (np.int32, ()),
+    "pv": (np.int16, (MAX_LINES, MAX_LINE_LENGTH)),
+    "pv_eval": (np.int32, (MAX_LINES,)),
+    "commentary_id": (np.int64, ()),
+}
+
+SHARD_PREFIX = "shard-"
+
+
+def pack_board(board):
+    """
+    Pack the piece placement of a python-chess Board into 32 bytes: one nibble per
+    square (a1 first), 0 = empty, 1-6 = White pawn..king, 7-12 = Black pawn..king.
+    """
+    nibbles = np.zeros(64, dtype=np.uint8)
+    for square, piece in board.piece_map().items():
+        nibbles[square] = piece.piece_type + (0 if piece.color == chess.WHITE else 6)
+    return (nibbles[0::2] | (nibbles[1::2] << 4)).astype(np.uint8)
+
+
+def unpack_board(packed):
+    """
+    Inverse of pack_board: returns a python-chess Board with only the pieces placed.
+    """
+    packed = np.asarray(packed, dtype=np.uint8)
+    nibbles = np.empty(64, dtype=np.uint8)
+    nibbles[0::2] = packed & 0x0F
+    nibbles[1::2] = packed >> 4
+    board = chess.Board(None)
+    for square in range(64):
+        code = int(nibbles[square])
+        if code:
+            color = chess.WHITE if code <= 6 else chess.BLACK
+            board.set_piece_at(square, chess.Piece(code - (0 if color == chess.WHITE else 6), color))
+    return board
+
+
+def encode_move(uci):
+    """
+    Encode a UCI move in 15 bits: from square, to square and promotion piece type.
+    """
+    move = chess.Move.from_uci(uci)
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code):
+    code = int(code)
+    if code < 0:
+        return None
+    promotion = code >> 12
+    return chess.Move(code & 0x3F, (code >> 6) & 0x3F, promotion or None).uci()
+
+
+def has_eval(columns):
+    """
+    Boolean mask of the rows in a scan's columns (or a bare eval array) that have a known evaluation.
+    """
+    evaluations = columns["eval"] if isinstance(columns, dict) else columns
+    return np.asarray(evaluations) != NO_EVAL
+
+
+class PositionWriter():
+    """
+    Buffers analysed positions and writes them to 'directory' as a new shard
+    every 'batch_size' rows. Call close() (or flush()) to write the last partial batch.
+
+    flush_interval: append() also writes the buffered rows once the last shard is at least
+                    this many seconds old, so a crash loses little (None = only by batch_size).
+    """
+
+    def __init__(self, directory, batch_size=1024, flush_interval=None):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._last_write = time.monotonic()
+        self._rows = []
+        self._lock = threading.Lock()  # appended to from pipeline worker threads
+        os.makedirs(directory, exist_ok=True)
+        self._next_shard = 0
+
+    def append(self, board, evaluation, best_lines=(), commentary_id=None, game=0):
+        """
+        Record one analysed position.
+        board: python-chess Board, evaluation: centipawns (White's perspective) or None,
+        best_lines: get_best_lines() output, commentary_id: commentary_cache.key_id() or None.
+        """
+        pv = np.full((MAX_LINES, MAX_LINE_LENGTH), -1, dtype=np.int16)
+        pv_eval = np.full(MAX_LINES, NO_EVAL, dtype=np.int32)
+        for i, line in enumerate(best_lines[:MAX_LINES]):
+            moves = line["line"][:MAX_LINE_LENGTH]
+            pv[i, :len(moves)] = [encode_move(uci) for uci in moves]
+            if line["evaluation"] is not None:
+                pv_eval[i] = line["evaluation"]
+        row = {
+            "game": game,
+            "ply": board.ply(),
+            "turn": 1 if board.turn == chess.WHITE else 0,
+            "board": pack_board(board),
+            "fen": board.fen().encode("ascii"),
+            "eval": NO_EVAL if evaluation is None else evaluation,
+            "pv": pv,
+            "pv_eval": pv_eval,
+            "commentary_id": -1 if commentary_id is None else commentary_id,
+        }
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_size or (self.flush_interval is not None and
+                                                       time.monotonic() - self._last_write >= self.flush_interval):
+                self._write_shard()
+
+    def flush(self):
+        with self._lock:
+            if self._rows:
+                self._write_shard()
+
+    def close(self):
+        self.flush()
+
+    def _write_shard(self):
+        # Rows stay buffered until the shard is in place, so a failed write loses nothing
+        # and is retried with the next append or flush.
+        rows = list(self._rows)
+        index = max(self._next_shard, _next_shard_index(self.directory))
+        name = "%s%06d-%d-%s" % (SHARD_PREFIX, index, os.getpid(), uuid.uuid4().hex[:8])
+        tmp_path = os.path.join(self.directory, "." + name + ".tmp")
+        try:
+            os.makedirs(tmp_path)
+            for column, (dtype, shape) in COLUMNS.items():
+                data = np.empty((len(rows),) + shape, dtype=dtype)
+                for i, row in enumerate(rows):
+                    data[i] = row[column]
+                np.save(os.path.join(tmp_path, column + ".npy"), data)
+            # Renaming the finished directory means readers never see a half-written shard.
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        self._next_shard = index + 1
+        self._last_write = time.monotonic()
+        del self._rows[:len(rows)]
+
+
+def _shard_index(name):
+    """
+    Write index of a shard directory name, or None if it is not a shard.
+    """
+    if not name.startswith(SHARD_PREFIX):
+        return None
+    index = name[len(SHARD_PREFIX):].split("-", 1)[0]
+    return int(index) if index.isdigit() else None
+
+
+def _next_shard_index(directory):
+    indices = [_shard_index(name) for name in os.listdir(directory)]
+    return max((index for index in indices if index is not None), default=-1) + 1
+
+
+def _shard_dirs(directory):
+    if not os.path.isdir(directory):
+        return []
+    shards = [(_shard_index(name), name) for name in os.listdir(directory)]
+    return [os.path.join(directory, name) for index, name in sorted(s for s in shards if s[0] is not None)]
+
+
+class PositionReader():
+    """
+    Memory-mapped access to the shards written by PositionWriter.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.shards = _shard_dirs(directory)
+
+    def __len__(self):
+        return sum(len(self._load(shard, "ply")) for shard in self.shards)
+
+    def _load(self, shard, column):
+        if column not in COLUMNS:
+            raise KeyError(f"Unknown column: {column}")
+        return np.load(os.path.join(shard, column + ".npy"), mmap_mode="r")
+
+    def scan(self, columns=None, where=None):
+        """
+        Yield one dict of column arrays per shard.
+        columns: names to return (default: all). where: optional function taking a dict of
+        memory-mapped columns (loaded on first access) and returning a boolean mask; only
+        the matching rows are materialised. Rows without an evaluation hold NO_EVAL, so
+        mask them out when filtering on eval, e.g. blunders for White:
+            reader.scan(["fen", "eval"], where=lambda c: has_eval(c) & (c["eval"] < -300))
+        """
+        columns = list(columns or COLUMNS)
+        for shard in self.shards:
+            mapped = _LazyColumns(self, shard)
+            if where is None:
+                yield {column: mapped[column] for column in columns}
+                continue
+            mask = np.asarray(where(mapped), dtype=bool)
+            if mask.any():
+                yield {column: mapped[column][mask] for column in columns}
+
+    def column(self, name, where=None):
+        """
+        Concatenate one column (optionally filtered) across all shards into memory.
+        """
+        parts = [part[name] for part in self.scan([name], where)]
+        if not parts:
+            dtype, shape = COLUMNS[name]
+            return np.empty((0,) + shape, dtype=dtype)
+        return np.concatenate(parts)
+
+
+class _LazyColumns(dict):
+    """
+    Dict of a shard's columns that memory-maps each column on first access.
+    """
+
+    def __init__(self, reader, shard):
+        super().__init__()
+        self._reader = reader
+        self._shard = shard
+
+    def __missing__(self, column):
+        self[column] = self._reader._load(self._shard, column)
+        return self[column]
@@ -0,0 +1,466 @@
+'''
+Headless end-to-end benchmark of the per-move path in chess_main.
+
+Recorded games are replayed through the same steps a mouse move goes through
+(GameState move, analysis board sync, Stockfish evaluation and best lines,
+prompt building, commentary, TTS) on the real pipeline scheduler, with fakes
+standing in for Stockfish, Ollama and pyttsx3. Each fake sleeps for a
+configurable synthetic latency, so the benchmark runs offline and measures the
+overhead of our own code plus the latency budget of the external services.
+
+Usage:
+    python myenv/replay_benchmark.py                        # built-in sample games
+    python myenv/replay_benchmark.py --games games.pgn --engine-latency 0.005 --llm-latency 0.2
+    python myenv/replay_benchmark.py --max-p95-ms 500       # non-zero exit on regression
+'''
+
+import argparse
+import http.server
+import json
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+import chess
+import chess.engine
+import chess.pgn
+import chess.polyglot
+
+import chess_engine
+import chess_main
+import commentary_cache
+import commentary_client
+import position_store
+import analysis_session
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Opera Game (Morphy 1858) and an English Attack Najdorf, both free of promotions and
+# en passant, which chess_engine.GameState does not generate yet.
+SAMPLE_GAMES = [
+    "e2e4 e7e5 g1f3 d7d6 d2d4 c8g4 d4e5 g4f3 d1f3 d6e5 f1c4 g8f6 f3b3 d8e7 b1c3 c7c6 c1g5 b7b5 "
+    "c3b5 c6b5 c4b5 b8d7 e1c1 a8d8 d1d7 d8d7 h1d1 e7e6 b5d7 f6d7 b3b8 d7b8 d1d8",
+    "e2e4 c7c5 g1f3 d7d6 d2d4 c5d4 f3d4 g8f6 b1c3 a7a6 c1e3 e7e5 d4b3 c8e6 f2f3 f8e7 d1d2 e8g8 "
+    "e1c1 b8d7 g2g4 b7b5 g4g5 b5b4 c3e2 f6e8 f3f4 a6a5 f4f5 a5a4 b3d4 e5d4 e2d4",
+]
+
+PIECE_VALUES = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 300, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+
+class SyntheticLatency():
+    """
+    Sleeps for 'latency' seconds, +/- a random 'jitter' fraction, from a seeded generator.
+    """
+
+    def __init__(self, latency, jitter=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def sleep(self):
+        self.calls += 1
+        if self.latency <= 0:
+            return
+        delay = self.latency
+        if self.jitter:
+            delay *= 1 + self.rng.uniform(-self.jitter, self.jitter)
+        time.sleep(delay)
+
+
+class FakeEngine():
+    """
+    Stand-in for chess.engine.SimpleEngine. Moves are picked deterministically from the
+    legal moves and scores are plain material counts, so no Stockfish binary is needed.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def pick_move(self, board):
+        moves = sorted(board.legal_moves, key=lambda m: m.uci())
+        return moves[chess.polyglot.zobrist_hash(board) % len(moves)] if moves else None
+
+    def play(self, board, limit, **kwargs):
+        self.latency.sleep()
+        return chess.engine.PlayResult(self.pick_move(board), None)
+
+    def analyse(self, board, limit, **kwargs):
+        self.latency.sleep()
+        return {"score": material_score(board), "depth": limit.depth}
+
+    def analysis(self, board, limit=None, multipv=None, **kwargs):
+        return FakeAnalysis(self, board, multipv or 1)
+
+    def quit(self):
+        pass
+
+
+class FakeAnalysis():
+    """
+    Stand-in for chess.engine.SimpleAnalysisResult: one more depth every engine latency
+    tick until stopped, with material-count scores and the fake engine's lines as PVs.
+    """
+
+    def __init__(self, engine, board, multipv):
+        self.engine = engine
+        self.board = board.copy()
+        self.multipv_count = multipv
+        self.depth = 0
+        self._stopped = threading.Event()
+        self._infos = []
+
+    @property
+    def info(self):
+        return self._infos[0].copy() if self._infos else {}
+
+    @property
+    def multipv(self):
+        return [info.copy() for info in self._infos]
+
+    def stop(self):
+        self._stopped.set()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.depth >= 99 or self._stopped.wait(self.engine.latency.latency):
+            raise StopIteration
+        self.engine.latency.calls += 1
+        self.depth += 1
+        moves = sorted(self.board.legal_moves, key=lambda m: m.uci())[:self.multipv_count]
+        self._infos = []
+        for index, move in enumerate(moves, start=1):
+            line_board = self.board.copy()
+            pv = []
+            while move is not None and len(pv) < 5:
+                pv.append(move)
+                line_board.push(move)
+                move = self.engine.pick_move(line_board)
+            self._infos.append({"multipv": index, "depth": self.depth, "score": material_score(line_board), "pv": pv})
+        return self.info
+
+
+class FakeOllama():
+    """
+    Stand-in for ollama.Client: chat() returns canned commentary after a delay,
+    generate() (used for warm-up) just waits.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def chat(self, model, messages, **kwargs):
+        self.latency.sleep()
+        prompt = messages[-1]["content"]
+        return {"message": {"role": "assistant", "content": f"What a move! ({len(prompt)} characters of context)"}}
+
+    def generate(self, model, prompt="", **kwargs):
+        self.latency.sleep()
+        return {"model": model, "response": "", "done": True}
+
+
+class StandInOllamaServer():
+    """
+    Local HTTP server speaking the subset of the Ollama API the commentary client uses
+    (/api/chat and /api/generate, non-streaming), so a real ollama.Client can be
+    benchmarked end to end without a model.
+    """
+
+    def __init__(self, latency, host="127.0.0.1", port=0):
+        fake = FakeOllama(latency)
+        self.requests = 0
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+
+            def do_POST(handler):
+                length = int(handler.headers.get("Content-Length", 0))
+                body = json.loads(handler.rfile.read(length) or b"{}")
+                self.requests += 1
+                if handler.path == "/api/chat":
+                    reply = fake.chat(body.get("model"), body.get("messages", []))
+                elif handler.path == "/api/generate":
+                    reply = fake.generate(body.get("model"), body.get("prompt", ""))
+                else:
+                    handler.send_error(404)
+                    return
+                reply = dict(reply, model=body.get("model"), done=True)
+                data = json.dumps(reply).encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", "application/json")
+                handler.send_header("Content-Length", str(len(data)))
+                handler.end_headers()
+                handler.wfile.write(data)
+
+            def log_message(handler, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.url = "http://%s:%d" % self.server.server_address[:2]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="ollama-standin", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeTTS():
+    """
+    Stand-in for a pyttsx3 engine: runAndWait() blocks for the synthetic speech time.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.queued = []
+
+    def setProperty(self, name, value):
+        pass
+
+    def say(self, text):
+        self.queued.append(text)
+
+    def runAndWait(self):
+        self.latency.sleep()
+        self.queued = []
+
+
+def material_score(board):
+    score = 0
+    for piece in board.piece_map().values():
+        value = PIECE_VALUES[piece.piece_type]
+        score += value if piece.color == chess.WHITE else -value
+    return chess.engine.PovScore(chess.engine.Cp(score), chess.WHITE)
+
+
+def read_games(path):
+    """
+    Read games as lists of UCI strings, from a PGN file or a text file with one game
+    of space-separated UCI moves per line.
+    """
+    games = []
+    if path.lower().endswith(".pgn"):
+        with open(path, "r", encoding="utf-8") as f:
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    break
+                games.append([move.uci() for move in game.mainline_moves()])
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    games.append(line.split())
+    return games
+
+
+def to_engine_move(uci, gs):
+    """
+    Convert a UCI string to a chess_engine.Move on the current GameState board.
+    """
+    square_from = chess.parse_square(uci[:2])
+    square_to = chess.parse_square(uci[2:4])
+    start = (7 - chess.square_rank(square_from), chess.square_file(square_from))
+    end = (7 - chess.square_rank(square_to), chess.square_file(square_to))
+    return chess_engine.Move(start, end, gs.board)
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def install_fakes(engine_latency, llm_latency, tts_latency, jitter=0.0, seed=0, verbose=False, ollama_host=None):
+    """
+    Point chess_main at the fakes and give it a fresh in-memory commentary cache.
+    With ollama_host, commentary goes through a real ollama.Client to that server instead
+    of the in-process fake. Unless verbose, chess_main's prompt/commentary output is off.
+    """
+    chess_main.VERBOSE = verbose
+    chess_main.sf_engine = FakeEngine(SyntheticLatency(engine_latency, jitter, seed))
+    if ollama_host is not None:
+        chess_main.llm_client = commentary_client.CommentaryClient(host=ollama_host, timeout=30)
+    else:
+        chess_main.llm_client = commentary_client.CommentaryClient(client=FakeOllama(SyntheticLatency(llm_latency, jitter, seed + 1)))
+    chess_main.tts_engine = FakeTTS(SyntheticLatency(tts_latency, jitter, seed + 2))
+    chess_main.comment_cache = commentary_cache.CommentaryCache()
+
+
+def replay(games, interval=None, max_plies=None, session=False):
+    """
+    Replay games through chess_main's per-move path.
+
+    interval=None waits for each ply to be spoken before playing the next one (pure latency).
+    A numeric interval plays a move every 'interval' seconds regardless, as in blitz or fast
+    PGN replay; plies the pipeline skips as stale are reported as not spoken.
+    session=True runs evaluation through an analysis_session.AnalysisSession like main() does.
+    """
+    plies = []
+    spoken_at = {}
+
+    def record_spoken(generation):
+        spoken_at[generation] = time.perf_counter()
+
+    chess_main.on_spoken = record_spoken
+    if session:
+        chess_main.sf_session = analysis_session.AnalysisSession(chess_main.sf_engine, multipv=3)
+    chess_main.pipeline.start()
+    started = time.perf_counter()
+    try:
+        for game_index, game in enumerate(games):
+            gs = chess_engine.GameState()
+            analysis_board = chess.Board()
+            chess_main.white_moves_history.clear()
+            chess_main.black_moves_history.clear()
+            for uci in game:
+                if max_plies is not None and len(plies) >= max_plies:
+                    break
+                submitted = time.perf_counter()
+                generation = chess_main.handle_move(gs, analysis_board, to_engine_move(uci, gs))
+                if generation is None:
+                    print(f"Game {game_index}: stopping at unsupported move {uci} (ply {len(analysis_board.move_stack) + 1})")
+                    break
+                plies.append({"game": game_index, "ply": len(analysis_board.move_stack), "move": uci,
+                              "generation": generation, "submitted": submitted})
+                if interval is None:
+                    chess_main.pipeline.wait_idle()
+                else:
+                    time.sleep(interval)
+        chess_main.pipeline.wait_idle()
+        finished = time.perf_counter()
+    finally:
+        chess_main.pipeline.shutdown(wait=True)
+        chess_main.on_spoken = None
+        if chess_main.sf_session is not None:
+            chess_main.sf_session.close()
+            chess_main.sf_session = None
+
+    for ply in plies:
+        done = spoken_at.get(ply.pop("generation"))
+        ply["spoken"] = done is not None
+        ply["latency_ms"] = (done - ply.pop("submitted")) * 1000 if done is not None else None
+    return plies, finished - started
+
+
+def summarise(plies, wall_time):
+    latencies = [ply["latency_ms"] for ply in plies if ply["latency_ms"] is not None]
+    return {
+        "plies": len(plies),
+        "spoken": len(latencies),
+        "wall_time_s": wall_time,
+        "throughput_plies_per_s": len(plies) / wall_time if wall_time > 0 else None,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies) if latencies else None,
+        "cache_hits": chess_main.comment_cache.hits,
+        "cache_misses": chess_main.comment_cache.misses,
+        "pipeline": chess_main.pipeline.metrics(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay games through the full commentary pipeline with fake services.")
+    parser.add_argument("--games", help="PGN file, or text file with one game of UCI moves per line (default: built-in samples)")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the game list this many times (later rounds hit the commentary cache)")
+    parser.add_argument("--max-plies", type=int, help="stop after this many plies in total")
+    parser.add_argument("--interval", type=float, help="seconds between moves; default waits for each ply to finish")
+    parser.add_argument("--engine-latency", type=float, default=0.002, help="seconds per fake engine play/analyse call")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake Ollama chat call")
+    parser.add_argument("--tts-latency", type=float, default=0.01, help="seconds per fake TTS utterance")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- fraction applied to each latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracemalloc", action="store_true", help="also report peak traced Python allocations (slower)")
+    parser.add_argument("--ollama-standin", action="store_true", help="serve commentary from a local HTTP stand-in through a real ollama.Client")
+    parser.add_argument("--session", action="store_true", help="evaluate with a persistent analysis session (one depth per engine latency tick)")
+    parser.add_argument("--export", help="also write analysed positions to this position_store directory")
+    parser.add_argument("--verbose", action="store_true", help="keep chess_main's prompt and commentary output")
+    parser.add_argument("--per-ply", action="store_true", help="print every ply's latency")
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="exit with status 1 if p95 latency exceeds this")
+    args = parser.parse_args(argv)
+
+    games = read_games(args.games) if args.games else [game.split() for game in SAMPLE_GAMES]
+    games = games * args.repeat
+    standin = None
+    if args.ollama_standin:
+        standin = StandInOllamaServer(SyntheticLatency(args.llm_latency, args.jitter, args.seed + 1)).start()
+    install_fakes(args.engine_latency, args.llm_latency, args.tts_latency, args.jitter, args.seed, args.verbose,
+                  ollama_host=standin.url if standin else None)
+    # Warm-up is part of startup, not of any ply, as in chess_main.main().
+    chess_main.llm_client.warm_up(background=False)
+
+    if args.export:
+        chess_main.position_writer = position_store.PositionWriter(args.export)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    plies, wall_time = replay(games, interval=args.interval, max_plies=args.max_plies, session=args.session)
+    if args.export:
+        chess_main.position_writer.close()
+    report = summarise(plies, wall_time)
+    if args.tracemalloc:
+        report["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    report["peak_rss_mb"] = peak_rss_mb()
+    report["llm_warm_up_s"] = chess_main.llm_client.warm_up_seconds
+    chess_main.llm_client.close()
+    if standin is not None:
+        standin.stop()
+
+    if args.per_ply:
+        for ply in plies:
+            latency = f"{ply['latency_ms']:.1f} ms" if ply["latency_ms"] is not None else "skipped"
+            print(f"game {ply['game']} ply {ply['ply']:3d} {ply['move']:6s} {latency}")
+
+    def fmt(value, unit=""):
+        return "n/a" if value is None else f"{value:.1f}{unit}"
+
+    print(f"Plies: {report['plies']} ({report['spoken']} spoken) in {report['wall_time_s']:.2f}s, "
+          f"{fmt(report['throughput_plies_per_s'])} plies/s")
+    print(f"Latency: p50 {fmt(report['p50_ms'], ' ms')}, p95 {fmt(report['p95_ms'], ' ms')}, "
+          f"p99 {fmt(report['p99_ms'], ' ms')}, max {fmt(report['max_ms'], ' ms')}")
+    print(f"Commentary cache: {report['cache_hits']} hits, {report['cache_misses']} misses")
+    memory = f"Peak RSS: {fmt(report['peak_rss_mb'], ' MB')}"
+    if "peak_traced_mb" in report:
+        memory += f", peak traced: {fmt(report['peak_traced_mb'], ' MB')}"
+    print(memory)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": report, "plies": plies}, f, indent=2)
+
+    if args.max_p95_ms is not None and report["p95_ms"] is not None and report["p95_ms"] > args.max_p95_ms:
+        print(f"p95 latency {report['p95_ms']:.1f} ms exceeds limit of {args.max_p95_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())